@@ -1,5 +1,6 @@
 import os
 import json
+import re
 import threading
 import time
 from datetime import datetime
@@ -8,6 +9,8 @@ from flask import Flask, render_template, request, jsonify, send_file, session,
 from werkzeug.utils import secure_filename
 import logging
 
+from json_utils import json_dumps
+
 from sherlock_runner import SherlockRunner
 from export_utils import ExportUtils
 from translations import get_translations, get_supported_languages
@@ -43,14 +46,16 @@ def safe_log(level, message, *args, **kwargs):
     except Exception:
         logger.error("Logging error occurred")
 
+# Characters stripped from usernames, compiled once for bulk username lists
+_USERNAME_UNSAFE_RE = re.compile(r'[<>"\'/\\;=&$%]')
+
 def _sanitize_username(username):
     """Sanitize username input for security"""
-    import re
     if not username:
         return ""
     
     # Remove potentially dangerous characters
-    username = re.sub(r'[<>"\'/\\;=&$%]', '', str(username))
+    username = _USERNAME_UNSAFE_RE.sub('', str(username))
     # Limit length to prevent buffer overflows
     username = username[:50]
     # Remove leading/trailing whitespace
@@ -88,6 +93,15 @@ app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
 auth_manager = AuthManager()
 history_manager = HistoryManager()
 
+# Import Sherlock and fetch its site list in the background once the app
+# serves its first request, so the first search does not pay for them.
+# Not at import time: that would run in tests and tools, and before
+# gunicorn --preload forks its workers
+@app.before_request
+def start_sherlock_warm_up():
+    """Start the one-time Sherlock warm-up"""
+    SherlockRunner.start_warm_up()
+
 # Add context processor for global template variables
 @app.context_processor
 def inject_global_vars():
@@ -421,8 +435,7 @@ def search():
                 flash(error_msg, 'error')
                 if filepath:
                     try:
-                        if os.path.exists(filepath):
-                            os.remove(filepath)
+                        os.remove(filepath)
                     except:
                         pass  # Ignore cleanup errors
                 return redirect(url_for('index'))
@@ -496,21 +509,16 @@ def search():
             try:
                 logging.info(f"Background search: Starting for {len(username_list)} usernames")
                 
+                # The results file and history status are written once, below
                 runner = SherlockRunner()
-                results = runner.run_search(
-                    username_list, 
-                    options, 
-                    search_id, 
-                    history_manager,
-                    username_owner
-                )
+                results = runner.run_search(username_list, options, search_id)
                 
                 # Save results to JSON file
                 results_file = os.path.join('results', f'{search_id}_results.json')
                 os.makedirs('results', exist_ok=True)
                 
-                with open(results_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
+                with open(results_file, 'wb') as f:
+                    f.write(json_dumps(results))
                 
                 logging.info(f"Search {search_id} completed and saved to {results_file}")
                 
@@ -572,17 +580,8 @@ def get_results(search_id):
         flash(translations.get('error_404', 'Search not found'), 'error')
         return redirect(url_for('history'))
     
-    # Try to read results from JSON file
-    results_file = os.path.join('results', f'{search_id}_results.json')
-    results_data = None
-    
-    if os.path.exists(results_file):
-        try:
-            with open(results_file, 'r', encoding='utf-8') as f:
-                results_data = json.load(f)
-            logging.info(f"Loaded results from {results_file}")
-        except Exception as e:
-            logging.error(f"Error reading results file {results_file}: {str(e)}")
+    # Read results through the history manager, which keeps recent ones parsed
+    results_data = history_manager.get_search_results(user['username'], search_id)
     
     # If no results file exists and search is completed, show error
     if not results_data and search_data.get('status') == 'completed':
@@ -634,10 +633,9 @@ def download_json(search_id):
         
         # Create temporary file
         import tempfile
-        import json
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(results_data, f, indent=2, ensure_ascii=False)
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.json', delete=False) as f:
+            f.write(json_dumps(results_data))
             temp_path = f.name
         
         return send_file(temp_path, 
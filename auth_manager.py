@@ -4,87 +4,160 @@ Handles user registration, login, and session management using JSON storage
 Implements security best practices including bcrypt, JWT, and rate limiting
 """
 
+import copy
+import hashlib
 import json
 import os
+import secrets
 import time
-import uuid
 import base64
+import threading
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List, Any
+from typing import Deque, Dict, Optional, List, Any, Tuple
 
 import bcrypt
 import jwt
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
+
+from json_utils import json_dumps, json_loads
 
 
 class AuthManager:
     def __init__(self, users_file='users.json', secret_key=None):
         self.users_file = users_file
+        # Last login times live apart from users.json so a login never rewrites every user
+        self.logins_file = os.path.join(os.path.dirname(users_file), 'last_logins.json')
         self.secret_key = secret_key or os.environ.get('SESSION_SECRET', 'default-secret-key')
         self.jwt_issuer = 'web-sherlock'
         self.jwt_algorithm = 'HS256'
-        self.login_attempts = {}  # In-memory rate limiting
+        # In-memory rate limiting: failed attempt times (time.monotonic()) per username
+        self.login_attempts: Dict[str, Deque[float]] = {}
+        self._attempts_lock = threading.Lock()
         self.max_attempts = 5
         self.lockout_duration = 300  # 5 minutes
+        # bcrypt cost factor for new hashes; checkpw reads the cost stored in each hash
+        self.bcrypt_rounds = int(os.environ.get('BCRYPT_ROUNDS', '11'))
+        # Parsed users file and its revoked tokens as a set, validated by (mtime_ns, size)
+        self._users_cache: Optional[Tuple[Tuple[int, int], Dict, frozenset]] = None
+        self._logins_cache: Optional[Tuple[Tuple[int, int], Dict[str, str]]] = None
+        # Recently verified JWT payloads keyed by token digest, with the time
+        # each entry stops being trusted (never past the token's own exp)
+        self._token_cache: Dict[bytes, Tuple[float, Dict]] = {}
+        self.token_cache_ttl = 60
+        self.token_cache_size = 10000
         
         # Initialize users file if it doesn't exist
         self._init_users_file()
     
     def _init_users_file(self):
         """Initialize users.json file if it doesn't exist"""
-        if not os.path.exists(self.users_file):
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump({
+        try:
+            with open(self.users_file, 'xb') as f:
+                f.write(json_dumps({
                     'users': {},
                     'revoked_tokens': [],
                     'created_at': datetime.utcnow().isoformat()
-                }, f, indent=2)
+                }))
+        except FileExistsError:
+            pass
     
     def _load_users(self) -> Dict:
-        """Load users data from JSON file"""
+        """Load a private, mutable copy of users data from JSON file"""
+        return copy.deepcopy(self._load_users_readonly())
+    
+    def _load_users_readonly(self) -> Dict:
+        """Load users data as a shared cached snapshot - callers must not mutate it"""
         try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            stat = os.stat(self.users_file)
+            file_version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            
+            # Serve from cache while the file is unchanged on disk
+            if self._users_cache and self._users_cache[0] == file_version:
+                return self._users_cache[1]
+            
+            with open(self.users_file, 'rb') as f:
+                data = json_loads(f.read())
+            self._users_cache = (file_version, data, frozenset(data.get('revoked_tokens', [])))
+            return data
         except (FileNotFoundError, json.JSONDecodeError):
             self._init_users_file()
-            return self._load_users()
+            return self._load_users_readonly()
     
     def _save_users(self, data: Dict):
         """Save users data to JSON file"""
-        with open(self.users_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with open(self.users_file, 'wb') as f:
+            f.write(json_dumps(data))
+        
+        stat = os.stat(self.users_file)
+        self._users_cache = ((stat.st_mtime_ns, stat.st_size, stat.st_ino), data,
+                             frozenset(data.get('revoked_tokens', [])))
+    
+    def _is_token_revoked(self, token: str, data: Optional[Dict] = None) -> bool:
+        """Check the token against the revoked tokens of a users snapshot"""
+        if data is None:
+            data = self._load_users_readonly()
+        # Set lookups are atomic under the GIL; the cache tuple is swapped whole
+        cached = self._users_cache
+        if cached and cached[1] is data:
+            return token in cached[2]
+        return token in data.get('revoked_tokens', [])
+    
+    def _load_last_logins(self) -> Dict[str, str]:
+        """Load the username -> last login time map (shared cached snapshot)"""
+        try:
+            stat = os.stat(self.logins_file)
+            file_version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if self._logins_cache and self._logins_cache[0] == file_version:
+                return self._logins_cache[1]
+            
+            with open(self.logins_file, 'rb') as f:
+                logins = json_loads(f.read())
+            self._logins_cache = (file_version, logins)
+            return logins
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _save_last_login(self, username: str, timestamp: str):
+        """Record a user's last login time"""
+        logins = dict(self._load_last_logins())
+        logins[username] = timestamp
+        with open(self.logins_file, 'wb') as f:
+            f.write(json_dumps(logins))
+        
+        stat = os.stat(self.logins_file)
+        self._logins_cache = ((stat.st_mtime_ns, stat.st_size, stat.st_ino), logins)
     
     def _rate_limit_check(self, username: str) -> bool:
         """Check if user is rate limited"""
-        current_time = time.time()
-        if username in self.login_attempts:
-            attempts, last_attempt = self.login_attempts[username]
-            if current_time - last_attempt < self.lockout_duration and attempts >= self.max_attempts:
-                return True
-            elif current_time - last_attempt >= self.lockout_duration:
-                # Reset attempts after lockout period
+        window_start = time.monotonic() - self.lockout_duration
+        with self._attempts_lock:
+            attempts = self.login_attempts.get(username)
+            if attempts is None:
+                return False
+            
+            # Drop failures that fell out of the lockout window
+            while attempts and attempts[0] < window_start:
+                attempts.popleft()
+            if not attempts:
                 del self.login_attempts[username]
-        return False
+                return False
+            return len(attempts) >= self.max_attempts
     
     def _record_login_attempt(self, username: str, success: bool):
         """Record login attempt for rate limiting"""
-        current_time = time.time()
-        if success:
-            # Clear attempts on successful login
-            if username in self.login_attempts:
-                del self.login_attempts[username]
-        else:
-            if username in self.login_attempts:
-                attempts, _ = self.login_attempts[username]
-                self.login_attempts[username] = (attempts + 1, current_time)
+        with self._attempts_lock:
+            if success:
+                # Clear attempts on successful login
+                self.login_attempts.pop(username, None)
             else:
-                self.login_attempts[username] = (1, current_time)
+                attempts = self.login_attempts.get(username)
+                if attempts is None:
+                    attempts = self.login_attempts[username] = deque(maxlen=self.max_attempts)
+                attempts.append(time.monotonic())
     
     def _hash_password(self, password: str) -> str:
         """Hash password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode('utf-8')
     
     def _verify_password(self, password: str, hashed: str) -> bool:
         """Verify password against hash"""
@@ -95,25 +168,33 @@ class AuthManager:
     
     def _generate_jwt(self, username: str) -> str:
         """Generate JWT token for user with enhanced security"""
-        jti = str(uuid.uuid4())
+        jti = secrets.token_urlsafe(16)
+        now = datetime.utcnow()
         payload = {
             'username': username,
             'iss': self.jwt_issuer,
             'jti': jti,
-            'exp': datetime.utcnow() + timedelta(hours=1),  # Reduced expiration time
-            'iat': datetime.utcnow(),
-            'nbf': datetime.utcnow()  # Not before timestamp
+            'exp': now + timedelta(hours=1),  # Reduced expiration time
+            'iat': now,
+            'nbf': now  # Not before timestamp
         }
         return jwt.encode(payload, self.secret_key, algorithm=self.jwt_algorithm)
     
-    def _verify_jwt(self, token: str) -> Optional[Dict]:
+    def _verify_jwt(self, token: str, data: Optional[Dict] = None) -> Optional[Dict]:
         """Verify JWT token with enhanced security checks"""
         try:
             # Check if token is revoked
-            data = self._load_users()
-            if token in data.get('revoked_tokens', []):
+            if self._is_token_revoked(token, data):
                 return None
             
+            # Skip signature verification for a token verified moments ago
+            cache_key = hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+            cached = self._token_cache.get(cache_key)
+            if cached:
+                if time.time() < cached[0]:
+                    return cached[1]
+                self._token_cache.pop(cache_key, None)
+            
             # Decode with strict validation - reject "none" algorithm
             payload = jwt.decode(
                 token, 
@@ -133,6 +214,10 @@ class AuthManager:
             # Additional validation
             if not payload.get('username'):
                 return None
+            
+            if len(self._token_cache) >= self.token_cache_size:
+                self._token_cache.clear()
+            self._token_cache[cache_key] = (min(payload['exp'], time.time() + self.token_cache_ttl), payload)
                 
             return payload
         except jwt.ExpiredSignatureError:
@@ -204,7 +289,7 @@ class AuthManager:
             return {'success': False, 'error': 'missing_credentials'}
         
         # Load users
-        data = self._load_users()
+        data = self._load_users_readonly()
         users = data.get('users', {})
         
         if username not in users:
@@ -224,9 +309,8 @@ class AuthManager:
             return {'success': False, 'error': 'invalid_credentials'}
         
         # Update last login
-        users[username]['last_login'] = datetime.utcnow().isoformat()
-        data['users'] = users
-        self._save_users(data)
+        last_login = datetime.utcnow().isoformat()
+        self._save_last_login(username, last_login)
         
         # Record successful login
         self._record_login_attempt(username, True)
@@ -240,13 +324,15 @@ class AuthManager:
             'user': {
                 'username': username,
                 'email': user_data['email'],
-                'last_login': users[username]['last_login']
+                'last_login': last_login
             }
         }
     
     def verify_token(self, token: str) -> Optional[Dict]:
         """Verify token and return user data"""
-        payload = self._verify_jwt(token)
+        # One users snapshot serves both the revocation check and the user lookup
+        data = self._load_users_readonly()
+        payload = self._verify_jwt(token, data)
         if not payload:
             return None
         
@@ -255,7 +341,6 @@ class AuthManager:
             return None
         
         # Get user data
-        data = self._load_users()
         users = data.get('users', {})
         
         if username not in users or not users[username].get('active', True):
@@ -283,7 +368,7 @@ class AuthManager:
     
     def get_user_profile(self, username: str) -> Optional[Dict]:
         """Get user profile data"""
-        data = self._load_users()
+        data = self._load_users_readonly()
         users = data.get('users', {})
         
         if username not in users:
@@ -294,7 +379,7 @@ class AuthManager:
             'username': username,
             'email': user_data['email'],
             'created_at': user_data['created_at'],
-            'last_login': user_data.get('last_login'),
+            'last_login': self._load_last_logins().get(username, user_data.get('last_login')),
             'active': user_data.get('active', True)
         }
     
@@ -1,11 +1,15 @@
 import csv
 import json
 import os
+import re
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import StringIO
 import logging
 
+logger = logging.getLogger(__name__)
+
 try:
     from reportlab.pdfgen import canvas
     from reportlab.lib.pagesizes import letter, A4
@@ -13,59 +17,50 @@ try:
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
-    logging.warning("ReportLab not available. PDF export will be limited.")
+    logger.warning("ReportLab not available. PDF export will be limited.")
+
+from json_utils import json_dumps
 
 from translations import get_translations
 
+# Matches characters that are not safe in export filenames built from a search_id
+_SAFE_ID_RE = re.compile(r'[^\w\-]+')
+
+# Deflate level for ZIP exports: level 1 is much faster than the default 6 and
+# the text payloads still compress well
+_ZIP_COMPRESSLEVEL = 1
+
+# Profile count above which the ZIP export renders JSON on a worker thread
+# while the CSV member is deflated (zlib releases the GIL)
+_PARALLEL_RENDER_THRESHOLD = 1000
+
+
 class ExportUtils:
+    # The results folder only needs to be created once per process
+    _dir_ensured = False
+
     def __init__(self, language='en'):
         self.language = language
         self.translations = get_translations(language)
         self.results_folder = 'results'
-        os.makedirs(self.results_folder, exist_ok=True)
+        
+        # Language-stable strings reused by every export
+        self._header = f"{self.translations['search_results']} - Web Sherlock"
+        self._sep_eq = "=" * 50
+        self._sep_dash = "-" * 30
+        self._profile_url_prefix = f"  {self.translations['profile_url']}: "
+        
+        if not ExportUtils._dir_ensured:
+            os.makedirs(self.results_folder, exist_ok=True)
+            ExportUtils._dir_ensured = True
     
     def export_csv(self, results, search_id):
         """Export results to CSV format"""
         from flask import Response
-        from io import StringIO
         
         # Create CSV content in memory
-        output = StringIO()
-        fieldnames = ['username', 'site', 'url', 'status', 'response_time']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        
-        # Write header
-        header_row = {
-            'username': self.translations['username'],
-            'site': self.translations['social_network'],
-            'url': self.translations['profile_url'],
-            'status': self.translations['status'],
-            'response_time': self.translations['response_time']
-        }
-        writer.writerow(header_row)
-        
-        # Write found profiles
-        for profile in results.get('found_profiles', []):
-            writer.writerow({
-                'username': profile['username'],
-                'site': profile['site'],
-                'url': profile['url'],
-                'status': self.translations['found'],
-                'response_time': profile.get('response_time', 0)
-            })
-        
-        # Write not found profiles
-        for profile in results.get('not_found_profiles', []):
-            writer.writerow({
-                'username': profile['username'],
-                'site': profile['site'],
-                'url': profile['url'],
-                'status': self.translations['not_found'],
-                'response_time': profile.get('response_time', 0)
-            })
-        
-        csv_content = output.getvalue()
-        output.close()
+        csv_content = self._render_csv(results.get('found_profiles', []),
+                                       results.get('not_found_profiles', []))
         
         # Create response with proper headers
         response = Response(
@@ -93,6 +88,7 @@ class ExportUtils:
         """Export PDF using ReportLab"""
         from flask import Response
         from io import BytesIO
+        from werkzeug.wsgi import FileWrapper
         from reportlab.pdfgen import canvas
         from reportlab.lib.pagesizes import A4
         
@@ -100,24 +96,27 @@ class ExportUtils:
             buffer = BytesIO()
             c = canvas.Canvas(buffer, pagesize=A4)
             width, height = A4
+            found_profiles = results.get('found_profiles') or []
+            not_found_profiles = results.get('not_found_profiles') or []
+            usernames = results.get('usernames') or []
             
             # Title
             c.setFont("Helvetica-Bold", 16)
-            c.drawString(50, height - 50, f"{self.translations['search_results']} - Web Sherlock")
+            c.drawString(50, height - 50, self._header)
             
             # Timestamp
             c.setFont("Helvetica", 10)
-            timestamp = results.get('search_timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            timestamp = results.get('search_timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             c.drawString(50, height - 70, f"{self.translations['timestamp']}: {timestamp}")
             
             # Summary
             c.setFont("Helvetica", 12)
             y_position = height - 100
             
-            total_found = len(results.get('found_profiles', []))
-            total_not_found = len(results.get('not_found_profiles', []))
+            total_found = len(found_profiles)
+            total_not_found = len(not_found_profiles)
             
-            c.drawString(50, y_position, f"{self.translations['usernames_searched']}: {', '.join(results.get('usernames', []))}")
+            c.drawString(50, y_position, f"{self.translations['usernames_searched']}: {', '.join(usernames)}")
             y_position -= 20
             c.drawString(50, y_position, f"{self.translations['profiles_found']}: {total_found}")
             y_position -= 20
@@ -130,36 +129,56 @@ class ExportUtils:
                 c.drawString(50, y_position, self.translations['found_profiles'])
                 y_position -= 20
                 
-                c.setFont("Helvetica", 10)
-                for profile in results.get('found_profiles', []):
-                    if y_position < 50:  # New page if needed
+                # Each profile takes 40pt; split into pages up front instead of
+                # checking the remaining space before every profile
+                first_page_rows = int(y_position - 50) // 40 + 1
+                rows_per_page = int(height - 100) // 40 + 1
+                pages = [found_profiles[:first_page_rows]] + [
+                    found_profiles[i:i + rows_per_page]
+                    for i in range(first_page_rows, total_found, rows_per_page)
+                ]
+                
+                # One text object per page instead of one per drawString() call
+                for page_number, page in enumerate(pages):
+                    if page_number:
                         c.showPage()
                         y_position = height - 50
                     
-                    c.drawString(60, y_position, f"{profile['username']} @ {profile['site']}")
-                    y_position -= 15
-                    c.drawString(70, y_position, profile['url'])
-                    y_position -= 25
+                    text = c.beginText()
+                    text.setFont("Helvetica", 10)
+                    set_origin = text.setTextOrigin
+                    text_out = text.textOut
+                    for profile in page:
+                        set_origin(60, y_position)
+                        text_out(f"{profile['username']} @ {profile['site']}")
+                        y_position -= 15
+                        set_origin(70, y_position)
+                        text_out(profile['url'])
+                        y_position -= 25
+                    c.drawText(text)
             
             c.save()
             
-            pdf_content = buffer.getvalue()
-            buffer.close()
+            # Stream the buffer as-is instead of copying it out with getvalue()
+            pdf_size = buffer.tell()
+            buffer.seek(0)
             
             # Create response
             response = Response(
-                pdf_content,
+                FileWrapper(buffer),
                 mimetype='application/pdf',
                 headers={
                     'Content-Disposition': f'attachment; filename=sherlock_results_{search_id}.pdf',
-                    'Content-Type': 'application/pdf'
-                }
+                    'Content-Type': 'application/pdf',
+                    'Content-Length': str(pdf_size)
+                },
+                direct_passthrough=True
             )
             
             return response
             
         except Exception as e:
-            logging.error(f"Error creating PDF with ReportLab: {str(e)}")
+            logger.error("Error creating PDF with ReportLab: %s", e)
             return self._export_pdf_simple(results, search_id)
     
     def _export_pdf_simple(self, results, search_id):
@@ -202,21 +221,24 @@ class ExportUtils:
     def _generate_text_content(self, results):
         """Generate text content for TXT and simple PDF export"""
         content = []
+        found_profiles = results.get('found_profiles') or []
+        not_found_profiles = results.get('not_found_profiles') or []
+        usernames = results.get('usernames') or []
         
         # Header
-        content.append(f"{self.translations['search_results']} - Web Sherlock")
-        content.append("=" * 50)
+        content.append(self._header)
+        content.append(self._sep_eq)
         
         # Timestamp
-        timestamp = results.get('search_timestamp', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        timestamp = results.get('search_timestamp') or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         content.append(f"{self.translations['timestamp']}: {timestamp}")
         content.append("")
         
         # Summary
-        total_found = len(results.get('found_profiles', []))
-        total_not_found = len(results.get('not_found_profiles', []))
+        total_found = len(found_profiles)
+        total_not_found = len(not_found_profiles)
         
-        content.append(f"{self.translations['usernames_searched']}: {', '.join(results.get('usernames', []))}")
+        content.append(f"{self.translations['usernames_searched']}: {', '.join(usernames)}")
         content.append(f"{self.translations['profiles_found']}: {total_found}")
         content.append(f"{self.translations['profiles_not_found']}: {total_not_found}")
         content.append("")
@@ -224,34 +246,105 @@ class ExportUtils:
         # Found profiles
         if total_found > 0:
             content.append(f"{self.translations['found_profiles']}:")
-            content.append("-" * 30)
+            content.append(self._sep_dash)
             
-            for profile in results.get('found_profiles', []):
-                content.append(f"• {profile['username']} @ {profile['site']}")
-                content.append(f"  {self.translations['profile_url']}: {profile['url']}")
-                content.append("")
+            profile_url_prefix = self._profile_url_prefix
+            content.extend(
+                line
+                for profile in found_profiles
+                for line in (f"• {profile['username']} @ {profile['site']}",
+                             profile_url_prefix + profile['url'],
+                             "")
+            )
         
         # Not found profiles
         if total_not_found > 0:
             content.append(f"{self.translations['not_found_profiles']}:")
-            content.append("-" * 30)
+            content.append(self._sep_dash)
             
-            for profile in results.get('not_found_profiles', []):
-                content.append(f"• {profile['username']} @ {profile['site']}")
+            content.extend(
+                f"• {profile['username']} @ {profile['site']}"
+                for profile in not_found_profiles
+            )
             content.append("")
         
         return '\n'.join(content)
     
+    def _render_csv(self, found_profiles, not_found_profiles):
+        """Render profiles as CSV text with a translated header"""
+        output = StringIO()
+        writer = csv.writer(output)
+        t = self.translations
+        found_status = t['found']
+        not_found_status = t['not_found']
+        
+        # Write header
+        writer.writerow((
+            t['username'],
+            t['social_network'],
+            t['profile_url'],
+            t['status'],
+            t['response_time']
+        ))
+        
+        # Write found profiles
+        writer.writerows(
+            (profile['username'], profile['site'], profile['url'],
+             found_status, profile.get('response_time', 0))
+            for profile in found_profiles
+        )
+        
+        # Write not found profiles
+        writer.writerows(
+            (profile['username'], profile['site'], profile['url'],
+             not_found_status, profile.get('response_time', 0))
+            for profile in not_found_profiles
+        )
+        
+        return output.getvalue()
+    
+    def _render_json(self, data):
+        """Render data as indented UTF-8 JSON"""
+        return json_dumps(data)
+    
+    def _sanitize_results(self, results):
+        """Copy results with sanitized, translated profile lists"""
+        sanitized_results = dict(results)
+        
+        if 'found_profiles' in results:
+            sanitized_results['found_profiles'] = self._sanitize_profiles(
+                results['found_profiles'], 'found', self.translations['found'])
+        
+        if 'not_found_profiles' in results:
+            sanitized_results['not_found_profiles'] = self._sanitize_profiles(
+                results['not_found_profiles'], 'not_found', self.translations['not_found'])
+        
+        return sanitized_results
+    
+    def _sanitize_profiles(self, profiles, status, status_label):
+        """Copy profiles with length-limited fields and a translated status"""
+        sanitized = []
+        for profile in profiles:
+            safe_profile = {
+                **profile,
+                'username': str(profile.get('username', ''))[:100],
+                'site': str(profile.get('site', ''))[:100],
+                'url': str(profile.get('url', ''))[:500]
+            }
+            if safe_profile.get('status') == status:
+                safe_profile['status'] = status_label
+            sanitized.append(safe_profile)
+        return sanitized
+    
     def export_zip_simple(self, results, search_id):
         """Export CSV and JSON formats in a ZIP file with security enhancements"""
         from flask import Response
-        from io import BytesIO, StringIO
-        import json
-        import re
+        from io import BytesIO
+        from werkzeug.wsgi import FileWrapper
         
         try:
             # Sanitize search_id to prevent path traversal
-            safe_search_id = re.sub(r'[^\w\-_]', '', str(search_id))
+            safe_search_id = _SAFE_ID_RE.sub('', str(search_id))
             if not safe_search_id:
                 safe_search_id = 'results'
             
@@ -261,98 +354,57 @@ class ExportUtils:
             # Define secure file list - only known, controlled filenames
             files_to_zip = []
             
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Generate CSV content
-                csv_output = StringIO()
-                fieldnames = ['username', 'site', 'url', 'status', 'response_time']
-                writer = csv.DictWriter(csv_output, fieldnames=fieldnames)
-                
-                # Write CSV header
-                header_row = {
-                    'username': self.translations['username'],
-                    'site': self.translations['social_network'],
-                    'url': self.translations['profile_url'],
-                    'status': self.translations['status'],
-                    'response_time': self.translations['response_time']
-                }
-                writer.writerow(header_row)
-                
-                # Write CSV data with input validation
-                for profile in results.get('found_profiles', []):
-                    # Sanitize profile data
-                    safe_profile = {
-                        'username': str(profile.get('username', ''))[:100],
-                        'site': str(profile.get('site', ''))[:100],
-                        'url': str(profile.get('url', ''))[:500],
-                        'status': self.translations['found'],
-                        'response_time': profile.get('response_time', 0)
-                    }
-                    writer.writerow(safe_profile)
+            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=_ZIP_COMPRESSLEVEL) as zipf:
+                # Sanitize profile data once and render both formats from it,
+                # copying the profile lists so the caller's results are left untouched
+                sanitized_results = self._sanitize_results(results)
+                found_profiles = sanitized_results.get('found_profiles', [])
+                not_found_profiles = sanitized_results.get('not_found_profiles', [])
                 
-                for profile in results.get('not_found_profiles', []):
-                    # Sanitize profile data
-                    safe_profile = {
-                        'username': str(profile.get('username', ''))[:100],
-                        'site': str(profile.get('site', ''))[:100],
-                        'url': str(profile.get('url', ''))[:500],
-                        'status': self.translations['not_found'],
-                        'response_time': profile.get('response_time', 0)
-                    }
-                    writer.writerow(safe_profile)
+                executor = json_future = None
+                if len(found_profiles) + len(not_found_profiles) >= _PARALLEL_RENDER_THRESHOLD:
+                    executor = ThreadPoolExecutor(max_workers=1)
+                    json_future = executor.submit(self._render_json, sanitized_results)
                 
-                # Secure filename for CSV
-                csv_filename = f'sherlock_results_{safe_search_id}.csv'
-                zipf.writestr(csv_filename, csv_output.getvalue())
-                files_to_zip.append(csv_filename)
-                csv_output.close()
-                
-                # Generate JSON content with data sanitization
-                translated_results = results.copy()
-                
-                # Sanitize JSON data
-                if 'found_profiles' in translated_results:
-                    for profile in translated_results['found_profiles']:
-                        profile['username'] = str(profile.get('username', ''))[:100]
-                        profile['site'] = str(profile.get('site', ''))[:100]
-                        profile['url'] = str(profile.get('url', ''))[:500]
-                        if profile.get('status') == 'found':
-                            profile['status'] = self.translations['found']
-                
-                if 'not_found_profiles' in translated_results:
-                    for profile in translated_results['not_found_profiles']:
-                        profile['username'] = str(profile.get('username', ''))[:100]
-                        profile['site'] = str(profile.get('site', ''))[:100]
-                        profile['url'] = str(profile.get('url', ''))[:500]
-                        if profile.get('status') == 'not_found':
-                            profile['status'] = self.translations['not_found']
-                
-                json_content = json.dumps(translated_results, indent=2, ensure_ascii=False)
-                
-                # Secure filename for JSON
-                json_filename = f'sherlock_results_{safe_search_id}.json'
-                zipf.writestr(json_filename, json_content)
-                files_to_zip.append(json_filename)
+                try:
+                    # Secure filename for CSV
+                    csv_filename = f'sherlock_results_{safe_search_id}.csv'
+                    csv_content = self._render_csv(found_profiles, not_found_profiles)
+                    zipf.writestr(csv_filename, csv_content)
+                    files_to_zip.append(csv_filename)
+                    
+                    # Secure filename for JSON
+                    json_filename = f'sherlock_results_{safe_search_id}.json'
+                    json_content = json_future.result() if json_future else self._render_json(sanitized_results)
+                    zipf.writestr(json_filename, json_content)
+                    files_to_zip.append(json_filename)
+                finally:
+                    if executor:
+                        executor.shutdown()
             
-            zip_content = zip_buffer.getvalue()
-            zip_buffer.close()
+            # Stream the buffer as-is instead of copying it out with getvalue()
+            zip_size = zip_buffer.tell()
+            zip_buffer.seek(0)
             
             # Secure response headers
             safe_filename = f'sherlock_results_{safe_search_id}.zip'
             response = Response(
-                zip_content,
+                FileWrapper(zip_buffer),
                 mimetype='application/zip',
+                direct_passthrough=True,
                 headers={
                     'Content-Disposition': f'attachment; filename="{safe_filename}"',
                     'Content-Type': 'application/zip',
+                    'Content-Length': str(zip_size),
                     'Content-Security-Policy': "default-src 'none'",
                     'X-Content-Type-Options': 'nosniff',
                     'Cache-Control': 'no-cache, no-store, must-revalidate'
                 }
             )
             
-            logging.info(f"Secure ZIP export created: {len(files_to_zip)} files")
+            logger.info("Secure ZIP export created: %d files", len(files_to_zip))
             return response
             
         except Exception as e:
-            logging.exception("Secure ZIP export failed")
+            logger.exception("Secure ZIP export failed")
             raise e
@@ -3,16 +3,69 @@ History Manager for Web Sherlock
 Handles user search history storage and management using JSON files
 """
 
+import copy
 import json
+import logging
 import os
+import tempfile
+import threading
 import time
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+
+from json_utils import json_dumps, json_dumps_line, json_loads
+
+logger = logging.getLogger(__name__)
+
+
+# Parsed results files kept in memory, most recently used last
+_RESULTS_CACHE_SIZE = 32
+
+# (epoch second, ISO string) of the last stamp handed out by _utcnow_iso()
+_last_stamp = (0, '')
+
+
+def _utcnow_iso() -> str:
+    """UTC ISO-8601 timestamp at one-second resolution, formatted once per second"""
+    global _last_stamp
+    second = int(time.time())
+    stamp = _last_stamp
+    if stamp[0] != second:
+        # Naive UTC, matching the utcnow() stamps already stored in history files
+        iso = datetime.fromtimestamp(second, timezone.utc).replace(tzinfo=None).isoformat()
+        stamp = _last_stamp = (second, iso)
+    return stamp[1]
+
+
+# Fold the status event log back into the history file past this size
+_EVENTS_COMPACT_BYTES = 1 << 20
+
+
+class _FilenameCharTable(dict):
+    """str.translate table keeping alphanumerics, '-' and '_', filled lazily per code point"""
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        value = codepoint if char.isalnum() or char in '-_' else None
+        self[codepoint] = value
+        return value
+
+
+_FILENAME_CHARS = _FilenameCharTable()
 
 
 class HistoryManager:
     def __init__(self, history_dir='history'):
         self.history_dir = history_dir
+        # Parsed history (with status events applied) and its search_id -> position
+        # index per file, keyed by path and validated by the (mtime_ns, size) of
+        # both the history file and its events log
+        self._cache: Dict[str, Tuple[Tuple, Dict, Dict[str, int]]] = {}
+        # Parsed results files keyed by path, validated like the history cache;
+        # the results page and every export read the same file again
+        self._results_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        # Serializes event appends against saves that fold and remove the log
+        self._lock = threading.RLock()
         self._ensure_history_dir()
     
     def _ensure_history_dir(self):
@@ -23,188 +76,301 @@ class HistoryManager:
     def _get_history_file(self, username: str) -> str:
         """Get history file path for user"""
         # Sanitize username for filename
-        safe_username = "".join(c for c in username if c.isalnum() or c in '-_').lower()
+        safe_username = username.translate(_FILENAME_CHARS).lower()
         return os.path.join(self.history_dir, f"history-{safe_username}.json")
     
+    def _events_file(self, username: str) -> str:
+        """Get the append-only status event log path for user"""
+        return self._get_history_file(username)[:-len('.json')] + '.events.jsonl'
+    
+    @staticmethod
+    def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+        """Return (mtime_ns, size, inode) of a file, or None if it does not exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        # The inode catches an os.replace that keeps the size within one mtime tick
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    @staticmethod
+    def _build_search_index(data: Dict) -> Dict[str, int]:
+        """Map each search_id to its position in the searches list"""
+        return {s['search_id']: i for i, s in enumerate(data.get('searches', [])) if s.get('search_id')}
+    
+    @staticmethod
+    def _compute_stats(searches: List[Dict]) -> Dict:
+        """Aggregate the history statistics kept under the '_stats' key"""
+        timestamps = [s['timestamp'] for s in searches if s.get('timestamp')]
+        return {
+            'total_usernames_searched': sum(len(s.get('usernames', [])) for s in searches),
+            'total_results_found': sum(s.get('found_count', 0) for s in searches),
+            'first_search': min(timestamps) if timestamps else None,
+            'last_search': max(timestamps) if timestamps else None
+        }
+    
+    def _new_history(self, username: str) -> Dict:
+        """Create an empty history for a user without a (readable) history file"""
+        now = _utcnow_iso()
+        return {
+            'username': username,
+            'searches': [],
+            'created_at': now,
+            'last_updated': now,
+            '_stats': self._compute_stats([])
+        }
+    
     def _load_history(self, username: str) -> Dict:
         """Load user history from file"""
+        return self._load_history_indexed(username)[0]
+    
+    def _load_history_indexed(self, username: str) -> Tuple[Dict, Dict[str, int]]:
+        """Load a private, mutable copy of user history along with its search_id index"""
+        data, index = self._load_history_readonly(username)
+        return copy.deepcopy(data), index
+    
+    def _load_history_readonly(self, username: str) -> Tuple[Dict, Dict[str, int]]:
+        """Load user history as a shared cached snapshot - callers must not mutate it"""
         history_file = self._get_history_file(username)
+        events_file = self._events_file(username)
         
-        if not os.path.exists(history_file):
-            return {
-                'username': username,
-                'searches': [],
-                'created_at': datetime.utcnow().isoformat(),
-                'last_updated': datetime.utcnow().isoformat()
-            }
+        history_version = self._file_version(history_file)
+        if history_version is None:
+            return self._new_history(username), {}
+        
+        # Serve from cache while neither file changed on disk
+        file_version = (history_version, self._file_version(events_file))
+        cached = self._cache.get(history_file)
+        if cached and cached[0] == file_version:
+            return cached[1], cached[2]
         
         try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(history_file, 'rb') as f:
+                data = json_loads(f.read())
+            index = self._build_search_index(data)
+            if '_stats' not in data:
+                # History written before aggregates were stored
+                data['_stats'] = self._compute_stats(data.get('searches', []))
+            if file_version[1] is not None:
+                self._apply_events(events_file, data, index)
+            self._cache[history_file] = (file_version, data, index)
+            return data, index
         except (FileNotFoundError, json.JSONDecodeError):
-            return {
-                'username': username,
-                'searches': [],
-                'created_at': datetime.utcnow().isoformat(),
-                'last_updated': datetime.utcnow().isoformat()
-            }
+            return self._new_history(username), {}
     
-    def _save_history(self, username: str, data: Dict):
-        """Save user history to file"""
+    @staticmethod
+    def _apply_events(events_file: str, data: Dict, index: Dict[str, int]):
+        """Replay status events over the base history, latest event winning"""
+        try:
+            with open(events_file, 'rb') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        
+        searches = data.get('searches', [])
+        stats = data['_stats']
+        for line in lines:
+            try:
+                event = json_loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn line from an interrupted append
+            position = index.get(event.pop('search_id', None))
+            if position is not None:
+                search = searches[position]
+                if 'found_count' in event:
+                    stats['total_results_found'] += event['found_count'] - search.get('found_count', 0)
+                search.update(event)
+    
+    @staticmethod
+    def _same_history(a: Dict, b: Dict) -> bool:
+        """Compare two history dicts, ignoring the last_updated stamp"""
+        return a.keys() == b.keys() and all(a[k] == b[k] for k in a if k != 'last_updated')
+    
+    def _save_history(self, username: str, data: Dict, force: bool = False):
+        """Save user history to file, folding in and removing the status event log"""
         history_file = self._get_history_file(username)
-        data['last_updated'] = datetime.utcnow().isoformat()
+        events_file = self._events_file(username)
+        
+        # Saves already cost O(N), so refresh the aggregates here rather than
+        # scanning the searches on every get_history_stats() call
+        data['_stats'] = self._compute_stats(data.get('searches', []))
         
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with self._lock:
+            # Skip the write when nothing changed since the last load/save and
+            # the files on disk are still the ones we cached
+            cached = self._cache.get(history_file)
+            if not force and cached and self._same_history(cached[1], data):
+                if (self._file_version(history_file), self._file_version(events_file)) == cached[0]:
+                    return
+            
+            data['last_updated'] = _utcnow_iso()
+            
+            # Write to a temporary file and atomically replace the history file so
+            # a crash mid-write never leaves a truncated history behind
+            with tempfile.NamedTemporaryFile('wb', dir=self.history_dir, prefix='.history-',
+                                             suffix='.tmp', delete=False) as f:
+                temp_file = f.name
+                try:
+                    f.write(json_dumps(data))
+                    f.flush()
+                    os.fsync(f.fileno())
+                except Exception:
+                    f.close()
+                    os.remove(temp_file)
+                    raise
+            os.replace(temp_file, history_file)
+            
+            # data was loaded with all events applied, so the log is now redundant
+            try:
+                os.remove(events_file)
+            except FileNotFoundError:
+                pass
+            
+            self._cache[history_file] = ((self._file_version(history_file), None),
+                                         data, self._build_search_index(data))
     
     def add_search(self, username: str, search_data: Dict) -> bool:
         """Add a search to user history - prevents duplicates"""
         try:
-            history = self._load_history(username)
-            search_id = search_data.get('search_id')
-            
-            # Check if search already exists - prevent duplicates
-            existing_search = None
-            for i, search in enumerate(history['searches']):
-                if search.get('search_id') == search_id:
-                    existing_search = i
-                    break
-            
-            # Create search entry
-            search_entry = {
-                'search_id': search_id,
-                'usernames': search_data.get('usernames', []),
-                'options': search_data.get('options', {}),
-                'timestamp': datetime.utcnow().isoformat(),
-                'status': search_data.get('status', 'running'),
-                'results_count': search_data.get('results_count', 0),
-                'found_count': search_data.get('found_count', 0),
-                'results_file': search_data.get('results_file'),
-                'export_files': search_data.get('export_files', [])
-            }
-            
-            if existing_search is not None:
-                # Update existing search instead of creating duplicate
-                history['searches'][existing_search] = search_entry
-                print(f"Updated existing search {search_id} instead of creating duplicate")
-            else:
-                # Add new search to beginning of list (most recent first)
-                history['searches'].insert(0, search_entry)
-                print(f"Added new search {search_id} to history")
-            
-            # Keep only last 50 searches to prevent bloat
-            if len(history['searches']) > 50:
-                history['searches'] = history['searches'][:50]
-            
-            self._save_history(username, history)
-            return True
+            with self._lock:
+                history, search_index = self._load_history_indexed(username)
+                search_id = search_data.get('search_id')
+                
+                # Check if search already exists - prevent duplicates
+                existing_search = search_index.get(search_id)
+                
+                # Create search entry
+                search_entry = {
+                    'search_id': search_id,
+                    'usernames': search_data.get('usernames', []),
+                    'options': search_data.get('options', {}),
+                    'timestamp': _utcnow_iso(),
+                    'status': search_data.get('status', 'running'),
+                    'results_count': search_data.get('results_count', 0),
+                    'found_count': search_data.get('found_count', 0),
+                    'results_file': search_data.get('results_file'),
+                    'export_files': search_data.get('export_files', [])
+                }
+                
+                if existing_search is not None:
+                    # Update existing search instead of creating duplicate
+                    history['searches'][existing_search] = search_entry
+                    logger.debug("Updated existing search %s instead of creating duplicate", search_id)
+                else:
+                    # Add new search to beginning of list (most recent first)
+                    history['searches'].insert(0, search_entry)
+                    logger.debug("Added new search %s to history", search_id)
+                
+                # Keep only last 50 searches to prevent bloat (truncate in place, no copy)
+                del history['searches'][50:]
+                
+                self._save_history(username, history)
+                return True
             
         except Exception as e:
-            print(f"Error adding search to history: {e}")
+            logger.error("Error adding search to history: %s", e)
             return False
     
     def get_history(self, username: str, limit: Optional[int] = None) -> List[Dict]:
         """Get user search history"""
         try:
-            history = self._load_history(username)
+            history, _ = self._load_history_readonly(username)
             searches = history.get('searches', [])
             
-            if limit:
-                searches = searches[:limit]
-            
-            return searches
+            # Copy the entries so callers never hold the cached list or its dicts
+            return [dict(search) for search in (searches[:limit] if limit else searches)]
             
         except Exception as e:
-            print(f"Error loading history: {e}")
+            logger.error("Error loading history: %s", e)
             return []
     
     def get_search(self, username: str, search_id: str) -> Optional[Dict]:
         """Get specific search from history"""
         try:
-            history = self._load_history(username)
-            searches = history.get('searches', [])
+            history, search_index = self._load_history_readonly(username)
+            position = search_index.get(search_id)
             
-            for search in searches:
-                if search.get('search_id') == search_id:
-                    return search
+            if position is not None:
+                # Copy so callers cannot change the cached entry
+                return dict(history['searches'][position])
             
             return None
             
         except Exception as e:
-            print(f"Error getting search: {e}")
+            logger.error("Error getting search: %s", e)
             return None
     
     def delete_search(self, username: str, search_id: str) -> bool:
         """Delete a specific search from history"""
         try:
-            history = self._load_history(username)
-            searches = history.get('searches', [])
-            
-            # Find and remove the search
-            original_length = len(searches)
-            searches = [s for s in searches if s.get('search_id') != search_id]
-            
-            if len(searches) < original_length:
-                history['searches'] = searches
-                self._save_history(username, history)
+            with self._lock:
+                history = self._load_history(username)
+                searches = history.get('searches', [])
                 
-                # Also try to delete associated files
-                self._cleanup_search_files(search_id)
-                return True
-            
-            return False
+                # Find and remove the search
+                original_length = len(searches)
+                searches = [s for s in searches if s.get('search_id') != search_id]
+                
+                if len(searches) < original_length:
+                    history['searches'] = searches
+                    self._save_history(username, history)
+                
+                    # Also try to delete associated files
+                    self._cleanup_search_files(search_id)
+                    return True
+                
+                return False
             
         except Exception as e:
-            print(f"Error deleting search: {e}")
+            logger.error("Error deleting search: %s", e)
             return False
     
     def clear_history(self, username: str) -> bool:
         """Clear all search history for user"""
         try:
-            history = self._load_history(username)
-            
-            # Get all search IDs for cleanup
-            search_ids = [s.get('search_id') for s in history.get('searches', []) if s.get('search_id')]
-            
-            # Clear searches
-            history['searches'] = []
-            self._save_history(username, history)
-            
-            # Cleanup associated files
-            for search_id in search_ids:
-                if search_id:
-                    self._cleanup_search_files(search_id)
-            
-            return True
+            with self._lock:
+                history = self._load_history(username)
+                
+                # Get all search IDs for cleanup
+                search_ids = [s.get('search_id') for s in history.get('searches', []) if s.get('search_id')]
+                
+                # Clear searches
+                history['searches'] = []
+                self._save_history(username, history)
+                
+                # Cleanup associated files
+                self._cleanup_search_files_bulk(search_ids)
+                
+                return True
             
         except Exception as e:
-            print(f"Error clearing history: {e}")
+            logger.error("Error clearing history: %s", e)
             return False
     
     def _cleanup_search_files(self, search_id: str):
         """Clean up files associated with a search"""
+        self._cleanup_search_files_bulk((search_id,))
+    
+    def _cleanup_search_files_bulk(self, search_ids: Iterable[str]):
+        """Clean up files associated with several searches in one directory pass"""
         try:
-            # Clean up results files
-            results_dir = 'results'
-            if os.path.exists(results_dir):
-                for filename in os.listdir(results_dir):
-                    if search_id in filename:
-                        file_path = os.path.join(results_dir, filename)
-                        try:
-                            os.remove(file_path)
-                        except OSError:
-                            pass
-            
-            # Clean up upload files if they contain search_id
-            uploads_dir = 'uploads'
-            if os.path.exists(uploads_dir):
-                for filename in os.listdir(uploads_dir):
-                    if search_id in filename:
-                        file_path = os.path.join(uploads_dir, filename)
-                        try:
-                            os.remove(file_path)
-                        except OSError:
-                            pass
+            ids = {search_id for search_id in search_ids if search_id}
+            if not ids:
+                return
+            
+            # Clean up results files, and upload files if they contain a search_id
+            for directory in ('results', 'uploads'):
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            name = entry.name
+                            if any(search_id in name for search_id in ids):
+                                try:
+                                    os.remove(entry.path)
+                                except OSError:
+                                    pass
+                except FileNotFoundError:
+                    continue
                             
         except Exception:
             pass  # Fail silently for cleanup
@@ -212,36 +378,20 @@ class HistoryManager:
     def get_history_stats(self, username: str) -> Dict:
         """Get history statistics for user"""
         try:
-            history = self._load_history(username)
+            history, _ = self._load_history_readonly(username)
             searches = history.get('searches', [])
-            
-            if not searches:
-                return {
-                    'total_searches': 0,
-                    'total_usernames_searched': 0,
-                    'total_results_found': 0,
-                    'first_search': None,
-                    'last_search': None
-                }
-            
-            total_usernames = sum(len(s.get('usernames', [])) for s in searches)
-            total_found = sum(s.get('found_count', 0) for s in searches)
-            
-            # Get date range
-            timestamps = [s.get('timestamp') for s in searches if s.get('timestamp')]
-            first_search = min(timestamps) if timestamps else None
-            last_search = max(timestamps) if timestamps else None
+            stats = history.get('_stats') or self._compute_stats(searches)
             
             return {
                 'total_searches': len(searches),
-                'total_usernames_searched': total_usernames,
-                'total_results_found': total_found,
-                'first_search': first_search,
-                'last_search': last_search
+                'total_usernames_searched': stats['total_usernames_searched'],
+                'total_results_found': stats['total_results_found'],
+                'first_search': stats['first_search'],
+                'last_search': stats['last_search']
             }
             
         except Exception as e:
-            print(f"Error getting history stats: {e}")
+            logger.error("Error getting history stats: %s", e)
             return {
                 'total_searches': 0,
                 'total_usernames_searched': 0,
@@ -255,26 +405,38 @@ class HistoryManager:
                            results_file: Optional[str] = None, export_files: Optional[List[str]] = None) -> bool:
         """Update search status and results info"""
         try:
-            history = self._load_history(username)
-            searches = history.get('searches', [])
+            history, search_index = self._load_history_readonly(username)
+            position = search_index.get(search_id)
+            if position is None:
+                return True
             
-            for search in searches:
-                if search.get('search_id') == search_id:
-                    search['status'] = status
-                    search['results_count'] = results_count
-                    search['found_count'] = found_count
-                    if results_file:
-                        search['results_file'] = results_file
-                    if export_files is not None:
-                        search['export_files'] = export_files
-                    break
+            changes = {
+                'status': status,
+                'results_count': results_count,
+                'found_count': found_count
+            }
+            if results_file:
+                changes['results_file'] = results_file
+            if export_files is not None:
+                changes['export_files'] = export_files
             
-            history['searches'] = searches
-            self._save_history(username, history)
+            search = history['searches'][position]
+            if all(search.get(key) == value for key, value in changes.items()):
+                return True
+            
+            # Append one event line instead of rewriting the whole history file;
+            # readers fold the log back in and saves compact it away
+            with self._lock:
+                with open(self._events_file(username), 'ab') as f:
+                    f.write(json_dumps_line({'search_id': search_id, **changes}))
+                    events_size = f.tell()
+                
+                if events_size > _EVENTS_COMPACT_BYTES:
+                    self._save_history(username, self._load_history(username), force=True)
             return True
             
         except Exception as e:
-            print(f"Error updating search status: {e}")
+            logger.error("Error updating search status: %s", e)
             return False
     
     def get_search_results(self, username: str, search_id: str) -> Optional[Dict]:
@@ -285,20 +447,33 @@ class HistoryManager:
                 return None
             
             results_file = search['results_file']
-            if not os.path.exists(results_file):
+            version = self._file_version(results_file)
+            if version is None:
                 return None
             
-            with open(results_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with self._lock:
+                cached = self._results_cache.pop(results_file, None)
+            if cached is None or cached[0] != version:
+                try:
+                    with open(results_file, 'rb') as f:
+                        cached = (version, json_loads(f.read()))
+                except FileNotFoundError:
+                    return None
+            
+            with self._lock:
+                self._results_cache[results_file] = cached
+                while len(self._results_cache) > _RESULTS_CACHE_SIZE:
+                    del self._results_cache[next(iter(self._results_cache))]
+            return cached[1]
                 
         except Exception as e:
-            print(f"Error loading search results: {e}")
+            logger.error("Error loading search results: %s", e)
             return None
     
     def export_history(self, username: str) -> Optional[str]:
         """Export user history to JSON file"""
         try:
-            history = self._load_history(username)
+            history, _ = self._load_history_readonly(username)
             
             # Create export filename
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
@@ -308,12 +483,13 @@ class HistoryManager:
             # Ensure uploads directory exists
             os.makedirs('uploads', exist_ok=True)
             
-            # Save export file
-            with open(export_path, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False)
+            # Save export file, without the internal aggregates
+            export = {key: value for key, value in history.items() if key != '_stats'}
+            with open(export_path, 'wb') as f:
+                f.write(json_dumps(export))
             
             return export_path
             
         except Exception as e:
-            print(f"Error exporting history: {e}")
+            logger.error("Error exporting history: %s", e)
             return None
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+JSON helpers shared by Web Sherlock modules.
+Use orjson when it is installed and fall back to the standard library.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def json_dumps(data: Any) -> bytes:
+    """Serialize data to indented UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def json_dumps_line(data: Any) -> bytes:
+    """Serialize data to one compact UTF-8 JSON line, newline included"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON bytes (orjson.JSONDecodeError subclasses json.JSONDecodeError)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
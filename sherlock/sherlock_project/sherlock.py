@@ -176,6 +176,7 @@ def sherlock(
     dump_response: bool = False,
     proxy: Optional[str] = None,
     timeout: int = 60,
+    session: Optional[requests.Session] = None,
 ):
     """Run Sherlock Analysis.
 
@@ -193,6 +194,9 @@ def sherlock(
     proxy                  -- String indicating the proxy URL
     timeout                -- Time in seconds to wait before timing out request.
                               Default is 60 seconds.
+    session                -- Optional requests.Session to send requests through,
+                              e.g. to reuse connections across calls.
+                              Ignored when using tor. Default is a new session.
 
     Return Value:
     Dictionary containing results from report. Key of dictionary is the name
@@ -234,7 +238,7 @@ def sherlock(
         underlying_session = underlying_request.session
     else:
         # Normal requests
-        underlying_session = requests.session()
+        underlying_session = session if session is not None else requests.session()
         underlying_request = requests.Request()
 
     # Limit number of workers to 20.
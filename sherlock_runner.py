@@ -1,19 +1,136 @@
+import codecs
+import csv
+import functools
 import subprocess
 import json
 import os
 import re
+import shutil
+import socket
+import sys
+import tempfile
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import deque
+from types import SimpleNamespace
+from typing import Iterable, List, Dict, Any, Optional
 from datetime import datetime
+from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import multiprocessing
+
+from json_utils import json_dumps
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# One pass over Sherlock's stdout picks out every result line:
+#   [+] SiteName: https://example.com/user
+#   [-] SiteName: Not Found!
+# 'line' is the (left-stripped) line, used to attribute results to a username
+_RESULT_LINE_RE = re.compile(
+    r'^[^\S\n]*(?P<line>\[(?:'
+    r'\+\][^\S\n]*(?P<found_site>[^:\n]+):[^\S\n]*(?P<url>https?://\S+)'
+    r'|-\][^\S\n]*(?P<missing_site>[^:\n]+):'
+    r')[^\n]*)',
+    re.MULTILINE
+)
+_URL_RE = re.compile(r'https?://[^\s]+')
+
+# Upper bound on concurrent Sherlock batches for one search
+MAX_PARALLEL_SEARCHES = 8
+
+# Hosts whose keep-alive connections the shared pools keep (Sherlock checks ~400 sites)
+SHARED_POOL_HOSTS = 512
+
+# Pre-resolve every site host during warm-up; set SHERLOCK_DNS_WARM_UP=0 to
+# skip the lookups (tests, offline environments)
+DNS_WARM_UP = os.environ.get('SHERLOCK_DNS_WARM_UP', '1') != '0'
+
+# Concurrent lookups when pre-resolving site hosts during warm-up
+DNS_WARM_UP_WORKERS = 32
+
+# Per-request timeout in seconds - balanced speed and completeness
+SHERLOCK_REQUEST_TIMEOUT = 3
+
+# Username k starts its pass over the site list k * stride sites in, so
+# concurrent usernames do not hit the same hosts at the same moment
+SITE_OFFSET_STRIDE = 20
+
+# Adaptive request timeout: P99 of recent response times times a multiplier,
+# clamped, once enough samples exist (otherwise SHERLOCK_REQUEST_TIMEOUT)
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0
+ADAPTIVE_TIMEOUT_MIN = 1.0
+ADAPTIVE_TIMEOUT_MAX = 15.0
+ADAPTIVE_TIMEOUT_MIN_SAMPLES = 20
+LATENCY_STATE_FILE = os.path.join('results', 'latency_state.json')
+
+# Response times (seconds) of definitive answers, shared by all runners
+_latency_samples = deque(maxlen=2000)
+_latency_lock = threading.Lock()
+_latency_loaded = False
+
+# Guards the one-time background warm-up started by start_warm_up()
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
+
+@functools.lru_cache(maxsize=4096)
+def _netloc_to_name(netloc: str) -> str:
+    """Site name for a lowercased host, e.g. 'www.github.com' -> 'Github'"""
+    # Remove 'www.' prefix
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    
+    # Get main domain name
+    parts = netloc.split('.')
+    if len(parts) >= 2:
+        return parts[0].title()
+    return netloc.title()
+
+
+class _UsernameMatcher:
+    """Find the first listed username occurring in a lowercased string.
+    
+    With pyahocorasick one automaton pass covers every username; otherwise
+    the usernames are tried one by one with substring checks.
+    """
+    
+    def __init__(self, usernames: List[str]):
+        self.lowered_usernames = [(username, username.lower()) for username in usernames]
+        self.automaton = None
+        if AHOCORASICK_AVAILABLE and self.lowered_usernames:
+            self.automaton = ahocorasick.Automaton()
+            # Keep the earliest position for duplicate lowercased usernames
+            for position, (username, lowered) in reversed(list(enumerate(self.lowered_usernames))):
+                self.automaton.add_word(lowered, (position, username))
+            self.automaton.make_automaton()
+    
+    def match(self, text: str) -> Optional[str]:
+        if self.automaton is not None:
+            # Earlier usernames win, as with the sequential checks
+            best = None
+            for _, found in self.automaton.iter(text):
+                if best is None or found[0] < best[0]:
+                    best = found
+            return best[1] if best is not None else None
+        
+        for username, lowered in self.lowered_usernames:
+            if lowered in text:
+                return username
+        return None
 
 class SherlockRunner:
     def __init__(self):
         self.sherlock_path = self._find_sherlock()
         self.working_dir = self._get_working_dir()
         
-    def _find_sherlock(self):
+    # Both lookups depend only on the process working directory, so they are
+    # resolved once and shared by every runner instance
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _find_sherlock():
         """Find Sherlock installation"""
         # Check integrated sherlock
         integrated_path = './sherlock/sherlock_project/__main__.py'
@@ -22,12 +139,172 @@ class SherlockRunner:
             
         return 'sherlock_project'  # Default fallback
     
-    def _get_working_dir(self):
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_working_dir():
         """Get working directory for Sherlock"""
         if os.path.exists('./sherlock/sherlock_project/__main__.py'):
             return './sherlock'
         return './sherlock'
     
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _load_sherlock_api() -> Optional[SimpleNamespace]:
+        """Import the integrated Sherlock package in-process, or None to fall back to the CLI"""
+        sherlock_dir = os.path.abspath(SherlockRunner._get_working_dir())
+        if sherlock_dir not in sys.path:
+            sys.path.insert(0, sherlock_dir)
+        
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from sherlock_project.sherlock import sherlock as search
+            from sherlock_project.notify import QueryNotify
+            from sherlock_project.result import QueryStatus
+            from sherlock_project.sites import SitesInformation
+        except (ImportError, SystemExit) as e:
+            logging.warning(f"Sherlock cannot run in-process, using subprocess instead: {str(e)}")
+            return None
+        
+        class SharedPoolAdapter(HTTPAdapter):
+            """HTTPAdapter that keeps its pools when a FuturesSession re-sizes it.
+            
+            sherlock() wraps every session in a FuturesSession, which re-inits
+            the mounted adapters' pools to its worker count and would drop the
+            warm connections.
+            """
+            
+            def init_poolmanager(self, *args, **kwargs):
+                if getattr(self, 'poolmanager', None) is None:
+                    super().init_poolmanager(*args, **kwargs)
+        
+        # One set of keep-alive pools for every search, so usernames reuse the
+        # TCP/TLS connections to each site; cookies stay per session
+        adapter = SharedPoolAdapter(pool_connections=SHARED_POOL_HOSTS,
+                                    pool_maxsize=MAX_PARALLEL_SEARCHES)
+        
+        def new_session():
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            return session
+        
+        return SimpleNamespace(search=search, QueryNotify=QueryNotify,
+                               QueryStatus=QueryStatus, SitesInformation=SitesInformation,
+                               new_session=new_session)
+    
+    @staticmethod
+    def _load_latency_state():
+        """Seed the response time window from the last saved state, once per process"""
+        global _latency_loaded
+        with _latency_lock:
+            if _latency_loaded:
+                return
+            _latency_loaded = True
+            try:
+                with open(LATENCY_STATE_FILE, 'r', encoding='utf-8') as f:
+                    _latency_samples.extend(float(sample) for sample in json.load(f))
+            except (OSError, ValueError, TypeError):
+                pass
+    
+    @staticmethod
+    def _save_latency_state():
+        """Persist the response time window for the next process"""
+        with _latency_lock:
+            samples = list(_latency_samples)
+        if not samples:
+            return
+        try:
+            os.makedirs(os.path.dirname(LATENCY_STATE_FILE), exist_ok=True)
+            with open(LATENCY_STATE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(samples, f)
+        except OSError as e:
+            logging.warning(f"Could not save latency state: {str(e)}")
+    
+    @staticmethod
+    def _record_latencies(samples: List[float]):
+        """Add response times to the rolling window"""
+        with _latency_lock:
+            _latency_samples.extend(samples)
+    
+    @staticmethod
+    def _adaptive_timeout() -> float:
+        """Request timeout sized from the rolling P99 response time"""
+        SherlockRunner._load_latency_state()
+        with _latency_lock:
+            samples = sorted(_latency_samples)
+        if len(samples) < ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            return SHERLOCK_REQUEST_TIMEOUT
+        
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        timeout = p99 * ADAPTIVE_TIMEOUT_MULTIPLIER
+        return round(max(ADAPTIVE_TIMEOUT_MIN, min(ADAPTIVE_TIMEOUT_MAX, timeout)), 1)
+    
+    @staticmethod
+    def start_warm_up():
+        """Run warm_up() on a background thread, once per process"""
+        global _warm_up_started
+        if _warm_up_started:
+            return
+        with _warm_up_lock:
+            if _warm_up_started:
+                return
+            _warm_up_started = True
+        threading.Thread(target=SherlockRunner.warm_up, daemon=True).start()
+    
+    @staticmethod
+    def warm_up():
+        """Import Sherlock and load the default site list ahead of the first search"""
+        try:
+            if SherlockRunner._load_sherlock_api() is not None:
+                site_data = SherlockRunner._load_site_data(False, False)
+                if DNS_WARM_UP:
+                    SherlockRunner._warm_dns(site_data)
+        except Exception as e:
+            logging.warning(f"Sherlock warm-up failed: {str(e)}")
+    
+    @staticmethod
+    def _warm_dns(site_data: Dict[str, Dict]):
+        """Resolve every site host in parallel so a caching resolver has them ready"""
+        hosts = set()
+        for info in site_data.values():
+            for key in ('urlMain', 'url', 'urlProbe'):
+                host = urlparse(info.get(key) or '').hostname
+                # Hosts with a {} placeholder depend on the username
+                if host and '{' not in host:
+                    hosts.add(host)
+        
+        def resolve(host):
+            try:
+                socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+                return True
+            except (OSError, UnicodeError):
+                return False
+        
+        with ThreadPoolExecutor(max_workers=DNS_WARM_UP_WORKERS) as executor:
+            resolved = sum(executor.map(resolve, hosts))
+        logging.info(f"Pre-resolved {resolved} of {len(hosts)} Sherlock site hosts")
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _load_site_data(local: bool, nsfw: bool) -> Dict[str, Dict]:
+        """Load Sherlock's site list once per process for each (local, nsfw) combination"""
+        api = SherlockRunner._load_sherlock_api()
+        local_file = os.path.join(os.path.abspath(SherlockRunner._get_working_dir()),
+                                  'sherlock_project', 'resources', 'data.json')
+        
+        if local:
+            sites = api.SitesInformation(local_file)
+        else:
+            # Same live data.json the CLI uses, with the bundled copy as a fallback
+            try:
+                sites = api.SitesInformation()
+            except Exception as e:
+                logging.warning(f"Could not fetch live Sherlock site data, using local copy: {str(e)}")
+                sites = api.SitesInformation(local_file)
+        
+        return {site.name: site.information for site in sites if nsfw or not site.is_nsfw}
+    
     def run_search(self, usernames: List[str], options: Dict[str, Any], 
                   search_id: str, history_manager=None, username_owner: Optional[str] = None) -> Dict:
         """Run UNIFIED Sherlock search - single search for ALL usernames"""
@@ -46,9 +323,12 @@ class SherlockRunner:
             
             # Execute SINGLE unified search with ALL usernames
             unified_results = self._search_all_usernames_unified(usernames, options)
+            self._save_latency_state()
             
-            # Process all results from unified search
-            for username, user_results in unified_results.items():
+            # Process all results from unified search, releasing each username's
+            # raw results once converted so both forms are never held in full
+            for username in usernames:
+                user_results = unified_results.pop(username, None) or {}
                 for site_name, site_data in user_results.items():
                     profile_data = {
                         'username': username,
@@ -75,8 +355,8 @@ class SherlockRunner:
                     results_file = f'results/sherlock_results_{search_id}.json'
                     os.makedirs('results', exist_ok=True)
                     
-                    with open(results_file, 'w', encoding='utf-8') as f:
-                        json.dump(results, f, indent=2, ensure_ascii=False)
+                    with open(results_file, 'wb') as f:
+                        f.write(json_dumps(results))
                     
                     # Update search status in history ONCE
                     history_manager.update_search_status(
@@ -110,14 +390,113 @@ class SherlockRunner:
             }
     
     def _search_all_usernames_unified(self, usernames: List[str], options: Dict[str, Any]) -> Dict:
-        """Execute single Sherlock command with all usernames at once"""
+        """Search all usernames, spreading them over concurrent Sherlock batches"""
+        workers = min(len(usernames), MAX_PARALLEL_SEARCHES)
+        if workers <= 1:
+            return self._search_usernames_batch(usernames, options)
+        
+        # Sherlock checks its usernames one after another, so run them side by
+        # side: in-process calls are cheap to start and go one username per
+        # task, while subprocesses get interleaved batches to amortize startup
+        if self._load_sherlock_api() is not None:
+            batches = [[username] for username in usernames]
+        else:
+            batches = [usernames[i::workers] for i in range(workers)]
+        logging.info(f"Running {len(usernames)} usernames on {workers} parallel Sherlock workers")
+        
+        batch_results = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._search_usernames_batch, batch, options, index)
+                       for index, batch in enumerate(batches)]
+            for future in as_completed(futures):
+                batch_results.update(future.result())
+        
+        # Keep the caller's username order
+        return {username: batch_results.get(username, {}) for username in usernames}
+    
+    def _search_usernames_batch(self, usernames: List[str], options: Dict[str, Any],
+                                first_index: int = 0) -> Dict:
+        """Search a batch of usernames, in-process when the Sherlock package imports"""
+        api = self._load_sherlock_api()
+        if api is None:
+            return self._search_usernames_subprocess(usernames, options)
+        return self._search_usernames_in_process(api, usernames, options, first_index)
+    
+    def _search_usernames_in_process(self, api: SimpleNamespace, usernames: List[str],
+                                     options: Dict[str, Any], first_index: int = 0) -> Dict:
+        """Call Sherlock's search function directly for each username in the batch"""
+        results = {username: {} for username in usernames}
+        
+        try:
+            site_data = self._load_site_data(bool(options.get('local', False)),
+                                             bool(options.get('nsfw', False)))
+            # Like --print-all: without it only found profiles are reported
+            print_all = options.get('print_all', False)
+            claimed = api.QueryStatus.CLAIMED
+            # Only definitive answers say how long a site takes to respond
+            definitive = (claimed, api.QueryStatus.AVAILABLE)
+            site_items = list(site_data.items())
+            timeout = self._adaptive_timeout()
+            
+            for index, username in enumerate(usernames, first_index):
+                # Rotate the site order per username (sherlock() requests sites in
+                # dict order); sherlock() stores request futures in each site's
+                # dict, so every call also gets its own shallow copies
+                offset = (index * SITE_OFFSET_STRIDE) % len(site_items) if site_items else 0
+                site_results = api.search(
+                    username,
+                    {name: dict(info) for name, info in site_items[offset:] + site_items[:offset]},
+                    api.QueryNotify(),
+                    timeout=timeout,
+                    session=api.new_session()
+                )
+                
+                # Report in the canonical site order regardless of the rotation
+                user_results = results[username]
+                latencies = []
+                for site_name, _ in site_items:
+                    site_result = site_results.get(site_name)
+                    if site_result is None:
+                        continue
+                    query_result = site_result['status']
+                    response_time = round(query_result.query_time or 0, 3)
+                    if query_result.query_time is not None and query_result.status in definitive:
+                        latencies.append(query_result.query_time)
+                    if query_result.status == claimed:
+                        user_results[site_name] = {
+                            'status': 'found',
+                            'url': query_result.site_url_user,
+                            'response_time': response_time
+                        }
+                    elif print_all:
+                        user_results[site_name] = {
+                            'status': 'not_found',
+                            'url': '',
+                            'response_time': response_time
+                        }
+                
+                self._record_latencies(latencies)
+                
+                found_count = sum(1 for result in user_results.values() if result['status'] == 'found')
+                logging.info(f"Username '{username}': {found_count} found, {len(user_results) - found_count} not found")
+            
+        except Exception as e:
+            logging.error(f"In-process Sherlock search error: {str(e)}")
+        
+        return results
+    
+    def _search_usernames_subprocess(self, usernames: List[str], options: Dict[str, Any]) -> Dict:
+        """Execute single Sherlock command with a batch of usernames at once"""
+        # Sherlock writes a CSV report per username here, keyed by site
+        report_dir = tempfile.mkdtemp(prefix='sherlock_')
         try:
             # Build command with all usernames
             cmd = ['python3', '-m', self.sherlock_path]
             
-            # Optimize timeout - 3 seconds per site for balanced speed and completeness
-            cmd.extend(['--timeout', '3'])
+            # Per-site timeout - adaptive once response times have been observed
+            cmd.extend(['--timeout', str(self._adaptive_timeout())])
             cmd.append('--no-color')
+            cmd.extend(['--csv', '--folderoutput', report_dir])
             
             # Add options - CORRECTED logic for print_all
             if options.get('print_all', False):
@@ -137,18 +516,41 @@ class SherlockRunner:
             
             # Execute single command with all usernames - Longer timeout for multiple users
             total_timeout = max(60, len(usernames) * 15)  # At least 15 seconds per username
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=total_timeout,
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 cwd=self.working_dir
             )
+            # The output is read as it streams, so enforce the deadline by killing
+            timed_out = threading.Event()
             
-            logging.info(f"Sherlock command completed with return code: {result.returncode}")
+            def expire():
+                timed_out.set()
+                proc.kill()
             
-            # Parse unified output
-            return self._parse_unified_output(result.stdout, result.stderr, usernames)
+            watchdog = threading.Timer(total_timeout, expire)
+            watchdog.start()
+            try:
+                with proc.stdout:
+                    # Parse unified output while Sherlock is still running
+                    results = self._parse_unified_blocks(self._iter_line_blocks(proc.stdout), usernames)
+                returncode = proc.wait()
+            finally:
+                watchdog.cancel()
+            
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, total_timeout)
+            
+            logging.info(f"Sherlock command completed with return code: {returncode}")
+            
+            # Prefer the structured reports; the parsed stdout covers any missing
+            print_all = options.get('print_all', False)
+            for username in usernames:
+                report = self._read_csv_report(os.path.join(report_dir, f'{username}.csv'), print_all)
+                if report is not None:
+                    results[username] = report
+            return results
             
         except subprocess.TimeoutExpired:
             logging.warning(f"Unified search timeout for {len(usernames)} usernames")
@@ -158,95 +560,156 @@ class SherlockRunner:
             logging.error(f"Unified search error: {str(e)}")
             # Return empty results for all usernames
             return {username: {} for username in usernames}
+        finally:
+            shutil.rmtree(report_dir, ignore_errors=True)
+    
+    @staticmethod
+    def _read_csv_report(path: str, print_all: bool) -> Optional[Dict]:
+        """Read one username's Sherlock CSV report, or None if it was not written"""
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+        except (OSError, csv.Error) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"Could not read Sherlock report {path}: {str(e)}")
+            return None
+        
+        results = {}
+        for row in rows:
+            try:
+                response_time = round(float(row.get('response_time_s') or 0), 3)
+            except ValueError:
+                response_time = 0
+            # Same reporting as the in-process search: found profiles, and the
+            # rest only with print_all
+            if row.get('exists') == 'Claimed':
+                results[row['name']] = {
+                    'status': 'found',
+                    'url': row.get('url_user', ''),
+                    'response_time': response_time
+                }
+            elif print_all:
+                results[row['name']] = {
+                    'status': 'not_found',
+                    'url': '',
+                    'response_time': response_time
+                }
+        return results
 
     def _parse_unified_output(self, stdout: str, stderr: str, usernames: List[str]) -> Dict:
         """Parse output from unified search with multiple usernames - IMPROVED parser"""
+        if stdout.count('\n') < 50:  # Only log if output is short
+            logging.debug(f"Output lines: {stdout.split(chr(10))[:20]}")
+        return self._parse_unified_blocks([stdout], usernames)
+    
+    @staticmethod
+    def _iter_line_blocks(stream, block_size: int = 1 << 16):
+        """Yield decoded runs of whole lines from a binary stream as data arrives"""
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        pending = ''
+        while True:
+            data = stream.read1(block_size)
+            if not data:
+                break
+            text = pending + decoder.decode(data)
+            cut = text.rfind('\n') + 1
+            pending = text[cut:]
+            if cut:
+                yield text[:cut]
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            yield pending
+    
+    @staticmethod
+    def _attribute_result_line(match, matcher: '_UsernameMatcher', usernames: List[str],
+                               results: Dict) -> None:
+        """Record one [+]/[-] result line under the username it belongs to"""
+        # Look for [+] found results with username
+        site_name = match.group('found_site')
+        if site_name is not None:
+            site_name = site_name.strip()
+            url = match.group('url')
+            
+            # Try to determine which username this belongs to
+            matched_username = matcher.match(url.lower())
+            
+            # If no match in URL, check if line contains username
+            if not matched_username:
+                matched_username = matcher.match(match.group('line').lower())
+            
+            # If still no match, assign to first username (fallback)
+            if not matched_username and usernames:
+                matched_username = usernames[0]
+            
+            if matched_username:
+                results[matched_username][site_name] = {
+                    'status': 'found',
+                    'url': url,
+                    'response_time': 0
+                }
+        
+        # Look for [-] not found results
+        else:
+            site_name = match.group('missing_site').strip()
+            
+            # Try to determine which username this belongs to
+            matched_username = matcher.match(match.group('line').lower())
+            
+            # If no match, assign to first username (fallback)
+            if not matched_username and usernames:
+                matched_username = usernames[0]
+            
+            if matched_username:
+                results[matched_username][site_name] = {
+                    'status': 'not_found',
+                    'url': '',
+                    'response_time': 0
+                }
+    
+    def _parse_unified_blocks(self, blocks: Iterable[str], usernames: List[str]) -> Dict:
+        """Parse Sherlock output arriving as runs of whole lines, for multiple usernames"""
         results = {username: {} for username in usernames}
         
         try:
-            lines = stdout.split('\n')
-            
-            # Debug output
-            logging.info(f"Parsing output with {len(lines)} lines for {len(usernames)} usernames")
-            if len(lines) < 50:  # Only log if output is short
-                logging.debug(f"Output lines: {lines[:20]}")
-            
-            # Method 1: Parse each line looking for patterns
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Look for [+] found results with username
-                if line.startswith('[+]'):
-                    match = re.search(r'\[\+\]\s*([^:]+):\s*(https?://[^\s]+)', line)
-                    if match:
-                        site_name = match.group(1).strip()
-                        url = match.group(2).strip()
-                        
-                        # Try to determine which username this belongs to
-                        matched_username = None
-                        for username in usernames:
-                            if username.lower() in url.lower() or username in url:
-                                matched_username = username
-                                break
-                        
-                        # If no match in URL, check if line contains username
-                        if not matched_username:
-                            for username in usernames:
-                                if username.lower() in line.lower():
-                                    matched_username = username
-                                    break
-                        
-                        # If still no match, assign to first username (fallback)
-                        if not matched_username and usernames:
-                            matched_username = usernames[0]
-                        
-                        if matched_username:
-                            results[matched_username][site_name] = {
-                                'status': 'found',
-                                'url': url,
-                                'response_time': 0
-                            }
-                
-                # Look for [-] not found results
-                elif line.startswith('[-]'):
-                    match = re.search(r'\[-\]\s*([^:]+):', line)
-                    if match:
-                        site_name = match.group(1).strip()
-                        
-                        # Try to determine which username this belongs to
-                        matched_username = None
-                        for username in usernames:
-                            if username.lower() in line.lower():
-                                matched_username = username
-                                break
-                        
-                        # If no match, assign to first username (fallback)
-                        if not matched_username and usernames:
-                            matched_username = usernames[0]
-                        
-                        if matched_username:
-                            results[matched_username][site_name] = {
-                                'status': 'not_found',
-                                'url': '',
-                                'response_time': 0
-                            }
+            matcher = _UsernameMatcher(usernames)
+            # URLs in the output, only needed while no result line has been seen
+            stray_urls = []
+            line_count = 0
+            matched_any = False
+            
+            # Method 1: Attribute each [+]/[-] result line to a username,
+            # one regex pass per block rather than a Python loop per line
+            for block in blocks:
+                line_count += block.count('\n')
+                for match in _RESULT_LINE_RE.finditer(block):
+                    matched_any = True
+                    self._attribute_result_line(match, matcher, usernames, results)
+                if not matched_any:
+                    stray_urls.extend(_URL_RE.findall(block))
+            
+            logging.info(f"Parsed output with {line_count} lines for {len(usernames)} usernames")
             
             # Method 2: If no results found, try alternative parsing
             total_results = sum(len(user_results) for user_results in results.values())
             if total_results == 0:
                 logging.warning("No results found with method 1, trying alternative parsing")
                 
-                # Look for any URLs in the output and distribute them among usernames
-                urls = re.findall(r'https?://[^\s]+', stdout)
+                # Every result line yields a result, so with none found all URLs are stray
+                urls = list(dict.fromkeys(stray_urls))
                 logging.info(f"Found {len(urls)} URLs in alternative parsing")
                 
-                for i, url in enumerate(urls):
-                    site_name = self._extract_site_name(url)
-                    username_index = i % len(usernames)  # Distribute URLs among usernames
-                    username = usernames[username_index]
+                for url in urls:
+                    # Credit a URL only to a username in its path; guessing an
+                    # owner would report profiles that were never found
+                    try:
+                        path = urlparse(url).path.lower()
+                    except ValueError:
+                        continue
+                    username = matcher.match(path)
+                    if username is None:
+                        continue
                     
+                    site_name = self._extract_site_name(url)
                     if site_name not in results[username]:
                         results[username][site_name] = {
                             'status': 'found',
@@ -272,55 +735,28 @@ class SherlockRunner:
         results = {}
         
         try:
-            lines = stdout.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
+            for match in _RESULT_LINE_RE.finditer(stdout):
                 # Look for [+] found results
-                if line.startswith('[+]'):
-                    # Pattern: [+] SiteName: https://example.com/user
-                    match = re.search(r'\[\+\]\s*([^:]+):\s*(https?://[^\s]+)', line)
-                    if match:
-                        site_name = match.group(1).strip()
-                        url = match.group(2).strip()
-                        results[site_name] = {
-                            'status': 'found',
-                            'url': url,
-                            'response_time': 0
-                        }
+                site_name = match.group('found_site')
+                if site_name is not None:
+                    results[site_name.strip()] = {
+                        'status': 'found',
+                        'url': match.group('url'),
+                        'response_time': 0
+                    }
                 
                 # Look for [-] not found results (if print-all was used)
-                elif line.startswith('[-]'):
-                    match = re.search(r'\[\-\]\s*([^:]+):', line)
-                    if match:
-                        site_name = match.group(1).strip()
-                        results[site_name] = {
-                            'status': 'not_found',
-                            'url': '',
-                            'response_time': 0
-                        }
-                
-                # Look for direct URLs without [+] prefix
-                elif 'http' in line and not line.startswith('['):
-                    # Try to extract site and URL
-                    url_match = re.search(r'https?://[^\s]+', line)
-                    if url_match:
-                        url = url_match.group(0)
-                        site_name = self._extract_site_name(url)
-                        results[site_name] = {
-                            'status': 'found',
-                            'url': url,
-                            'response_time': 0
-                        }
+                else:
+                    results[match.group('missing_site').strip()] = {
+                        'status': 'not_found',
+                        'url': '',
+                        'response_time': 0
+                    }
             
             # If no results found, try alternative parsing
             if not results:
                 # Look for any URLs in the output
-                urls = re.findall(r'https?://[^\s]+', stdout)
-                for url in urls:
+                for url in _URL_RE.findall(stdout):
                     site_name = self._extract_site_name(url)
                     if site_name not in results:
                         results[site_name] = {
@@ -345,20 +781,8 @@ class SherlockRunner:
     def _extract_site_name(self, url: str) -> str:
         """Extract site name from URL"""
         try:
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Remove 'www.' prefix
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            # Get main domain name
-            parts = domain.split('.')
-            if len(parts) >= 2:
-                return parts[0].title()
-            return domain.title()
-            
+            # The same hosts recur for every username, so the naming is cached
+            return _netloc_to_name(urlparse(url).netloc.lower())
         except Exception:
             return "Unknown"
     
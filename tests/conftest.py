@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app modules live at the repository root and the integrated Sherlock
+# package under sherlock/; neither is installed
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'sherlock')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,152 @@
+import csv
+import inspect
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+from sherlock_project.result import QueryResult, QueryStatus
+from sherlock_project.sherlock import sherlock
+
+import sherlock_runner
+from sherlock_runner import SherlockRunner
+
+
+SITE_DATA = {
+    'GitHub': {'urlMain': 'https://github.com/', 'url': 'https://github.com/{}'},
+    'GitLab': {'urlMain': 'https://gitlab.com/', 'url': 'https://gitlab.com/{}'},
+    'Reddit': {'urlMain': 'https://www.reddit.com/', 'url': 'https://www.reddit.com/user/{}'},
+}
+
+CANNED_STATUS = {
+    'GitHub': (QueryStatus.CLAIMED, 0.25),
+    'GitLab': (QueryStatus.AVAILABLE, 0.5),
+    'Reddit': (QueryStatus.UNKNOWN, None),
+}
+
+
+@pytest.fixture()
+def fake_api(monkeypatch):
+    """In-process API whose sherlock() returns canned QueryResults"""
+    calls = []
+    latencies = []
+
+    def search(username, site_data, query_notify, timeout=60, session=None):
+        calls.append((username, list(site_data), site_data))
+        results = {}
+        for site_name in site_data:
+            status, query_time = CANNED_STATUS[site_name]
+            url = SITE_DATA[site_name]['url'].format(username)
+            results[site_name] = {
+                'url_user': url,
+                'status': QueryResult(username, site_name, url, status, query_time=query_time),
+            }
+        return results
+
+    monkeypatch.setattr(SherlockRunner, '_load_site_data',
+                        staticmethod(lambda local, nsfw: SITE_DATA))
+    monkeypatch.setattr(SherlockRunner, '_adaptive_timeout', staticmethod(lambda: 3))
+    monkeypatch.setattr(SherlockRunner, '_record_latencies', staticmethod(latencies.extend))
+    api = SimpleNamespace(search=search, QueryNotify=lambda: None, QueryStatus=QueryStatus,
+                          new_session=lambda: None)
+    return SimpleNamespace(api=api, calls=calls, latencies=latencies)
+
+
+def test_in_process_reports_claimed_sites_as_found(fake_api):
+    results = SherlockRunner()._search_usernames_in_process(fake_api.api, ['alice'], {})
+
+    assert results == {'alice': {
+        'GitHub': {'status': 'found', 'url': 'https://github.com/alice', 'response_time': 0.25},
+    }}
+
+
+def test_in_process_print_all_reports_the_rest_as_not_found(fake_api):
+    results = SherlockRunner()._search_usernames_in_process(fake_api.api, ['alice'],
+                                                             {'print_all': True})
+
+    assert list(results['alice']) == ['GitHub', 'GitLab', 'Reddit']
+    assert results['alice']['GitLab'] == {'status': 'not_found', 'url': '', 'response_time': 0.5}
+    assert results['alice']['Reddit'] == {'status': 'not_found', 'url': '', 'response_time': 0}
+
+
+def test_in_process_records_only_definitive_latencies(fake_api):
+    SherlockRunner()._search_usernames_in_process(fake_api.api, ['alice'], {})
+
+    assert fake_api.latencies == [0.25, 0.5]
+
+
+def test_in_process_rotates_site_order_and_copies_site_data(fake_api):
+    SherlockRunner()._search_usernames_in_process(fake_api.api, ['alice', 'bob'], {},
+                                                  first_index=0)
+
+    (_, alice_order, alice_sites), (_, bob_order, _) = fake_api.calls
+    assert alice_order == ['GitHub', 'GitLab', 'Reddit']
+    offset = sherlock_runner.SITE_OFFSET_STRIDE % len(SITE_DATA)
+    assert bob_order == alice_order[offset:] + alice_order[:offset]
+    assert alice_sites['GitHub'] == SITE_DATA['GitHub']
+    assert alice_sites['GitHub'] is not SITE_DATA['GitHub']
+
+
+def write_report(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['username', 'name', 'url_main', 'url_user', 'exists',
+                         'http_status', 'response_time_s'])
+        writer.writerows(rows)
+
+
+def test_read_csv_report(tmp_path):
+    report = tmp_path / 'alice.csv'
+    write_report(report, [
+        ['alice', 'GitHub', 'https://github.com/', 'https://github.com/alice', 'Claimed', '200', '0.1234'],
+        ['alice', 'GitLab', 'https://gitlab.com/', 'https://gitlab.com/alice', 'Available', '404', ''],
+        ['alice', 'Reddit', 'https://www.reddit.com/', 'https://www.reddit.com/user/alice', 'Unknown', '', 'n/a'],
+    ])
+
+    assert SherlockRunner._read_csv_report(str(report), False) == {
+        'GitHub': {'status': 'found', 'url': 'https://github.com/alice', 'response_time': 0.123},
+    }
+    assert SherlockRunner._read_csv_report(str(report), True) == {
+        'GitHub': {'status': 'found', 'url': 'https://github.com/alice', 'response_time': 0.123},
+        'GitLab': {'status': 'not_found', 'url': '', 'response_time': 0},
+        'Reddit': {'status': 'not_found', 'url': '', 'response_time': 0},
+    }
+
+
+def test_read_csv_report_missing_file(tmp_path):
+    assert SherlockRunner._read_csv_report(str(tmp_path / 'nobody.csv'), True) is None
+
+
+@pytest.fixture()
+def latency_window(monkeypatch):
+    """Empty response time window that is not seeded from disk"""
+    samples = deque(maxlen=2000)
+    monkeypatch.setattr(sherlock_runner, '_latency_samples', samples)
+    monkeypatch.setattr(sherlock_runner, '_latency_loaded', True)
+    return samples
+
+
+def test_adaptive_timeout_needs_enough_samples(latency_window):
+    latency_window.extend([5.0] * (sherlock_runner.ADAPTIVE_TIMEOUT_MIN_SAMPLES - 1))
+
+    assert SherlockRunner._adaptive_timeout() == sherlock_runner.SHERLOCK_REQUEST_TIMEOUT
+
+
+def test_adaptive_timeout_scales_p99(latency_window):
+    latency_window.extend([1.0] * 198 + [2.0] * 2)
+
+    assert SherlockRunner._adaptive_timeout() == 2.0 * sherlock_runner.ADAPTIVE_TIMEOUT_MULTIPLIER
+
+
+@pytest.mark.parametrize('latency, expected', [
+    (0.01, sherlock_runner.ADAPTIVE_TIMEOUT_MIN),
+    (100.0, sherlock_runner.ADAPTIVE_TIMEOUT_MAX),
+])
+def test_adaptive_timeout_is_clamped(latency_window, latency, expected):
+    latency_window.extend([latency] * 100)
+
+    assert SherlockRunner._adaptive_timeout() == expected
+
+
+def test_vendored_sherlock_accepts_a_session():
+    # Local patch to the integrated Sherlock package; keep it across upstream syncs
+    assert 'session' in inspect.signature(sherlock).parameters
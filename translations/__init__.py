@@ -3,60 +3,138 @@ Modular Translation System for Web Sherlock
 Supports easy addition of new languages and dynamic loading
 """
 
+import codecs
 import json
+import logging
 import os
-from typing import Dict, List, Optional
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from json_utils import json_dumps, json_loads
+
+logger = logging.getLogger(__name__)
+
+
+# Marks a key absent from a translation map
+_MISSING = object()
+
+
+def _file_version(stat: os.stat_result) -> Tuple[int, int, int]:
+    """(mtime_ns, size, inode) of a file; the inode changes on every os.replace"""
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _intern_keys(translations: Dict[str, str]) -> Dict[str, str]:
+    """Copy a translation map with interned keys.
+    
+    Key literals in code and templates are interned too, so lookups then
+    compare keys by identity instead of character by character.
+    """
+    return {sys.intern(key): value for key, value in translations.items()}
 
 
 class TranslationManager:
     def __init__(self, translations_dir='translations'):
         self.translations_dir = translations_dir
-        self._translations_cache = {}
+        # Directory with a trailing separator; language files are prefix + code + .json
+        self._path_prefix = os.path.join(translations_dir, '')
         self.default_language = 'en'
-        self.supported_languages = self._discover_languages()
-    
-    def _discover_languages(self) -> List[str]:
-        """Automatically discover available language files"""
-        languages = []
-        if os.path.exists(self.translations_dir):
-            for filename in os.listdir(self.translations_dir):
-                if filename.endswith('.json') and not filename.startswith('_'):
-                    lang_code = filename[:-5]  # Remove .json extension
-                    languages.append(lang_code)
-        return sorted(languages)
+        # Serializes writers. Readers never lock: writers build new dicts and
+        # lists aside and rebind them
+        self._write_lock = threading.RLock()
+        self._translations_cache: Dict[str, Dict[str, str]] = {}
+        # Version of each cached language file when it was last read or written
+        self._versions: Dict[str, Tuple[int, int, int]] = {}
+        # Versions of language files that failed to parse, skipped until they change
+        self._failed_versions: Dict[str, Tuple[int, int, int]] = {}
+        self._install(self._scan_languages())
     
-    def _load_language(self, language: str) -> Dict[str, str]:
-        """Load translations for a specific language"""
-        if language in self._translations_cache:
-            return self._translations_cache[language]
+    def _install(self, versions: Dict[str, Tuple[int, int, int]]):
+        """Swap in the given language files, re-parsing only new or changed ones.
         
-        language_file = os.path.join(self.translations_dir, f"{language}.json")
+        The files are few and small, so every language is loaded up front.
+        Files that fail to parse are left out of the supported languages.
+        """
+        cache = {}
+        loaded_versions = {}
+        failed_versions = {}
+        for language, version in versions.items():
+            translations = self._translations_cache.get(language)
+            if translations is None or self._versions.get(language) != version:
+                if self._failed_versions.get(language) == version:
+                    failed_versions[language] = version
+                    continue
+                translations = self._read_language(language)
+                if translations is None:
+                    failed_versions[language] = version
+                    continue
+            cache[language] = translations
+            loaded_versions[language] = version
+        languages = sorted(cache)
         
-        if not os.path.exists(language_file):
-            # Fallback to default language
-            if language != self.default_language:
-                return self._load_language(self.default_language)
-            else:
-                # Return empty dict if even default language is missing
-                return {}
+        with self._write_lock:
+            self._translations_cache = cache
+            self._versions = loaded_versions
+            self._failed_versions = failed_versions
+            self.supported_languages = languages
+            # Set twin of supported_languages for membership tests
+            self._supported_set = set(languages)
+            # Lookups in languages that failed to load go straight to this
+            self._default_map = cache.get(self.default_language, {})
+    
+    def _scan_languages(self) -> Dict[str, Tuple[int, int, int]]:
+        """Automatically discover available language files, mapped to their versions"""
+        versions = {}
+        try:
+            entries = os.scandir(self.translations_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            return versions
         
+        # DirEntry carries the file type from the directory read, no extra stat
+        with entries:
+            for entry in entries:
+                filename = entry.name
+                if (filename.endswith('.json') and not filename.startswith('_')
+                        and entry.is_file()):
+                    try:
+                        version = _file_version(entry.stat())
+                    except FileNotFoundError:
+                        continue
+                    lang_code = filename[:-5]  # Remove .json extension
+                    versions[lang_code] = version
+        return versions
+    
+    def _read_language(self, language: str) -> Optional[Dict[str, str]]:
+        """Read and parse a language file, or None if it is missing or invalid"""
+        language_file = f"{self._path_prefix}{language}.json"
         try:
-            with open(language_file, 'r', encoding='utf-8') as f:
-                translations = json.load(f)
-                self._translations_cache[language] = translations
-                return translations
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading translations for {language}: {e}")
-            if language != self.default_language:
-                return self._load_language(self.default_language)
-            return {}
+            # Parse straight from bytes; orjson decodes UTF-8 itself
+            with open(language_file, 'rb') as f:
+                data = f.read()
+            # Some editors save UTF-8 with a BOM, which JSON parsers reject
+            if data.startswith(codecs.BOM_UTF8):
+                data = data[len(codecs.BOM_UTF8):]
+            return _intern_keys(json_loads(data))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, IOError, AttributeError) as e:
+            logger.error("Error loading translations for %s: %s", language, e)
+            return None
+    
+    def _load_language(self, language: str) -> Dict[str, str]:
+        """Load translations for a specific language"""
+        # Every supported language is loaded up front; anything else falls back
+        # to the default language ({} if it is missing too)
+        return self._translations_cache.get(language, self._default_map)
     
     def get_translations(self, language: Optional[str] = None) -> Dict[str, str]:
         """Get translations for specified language"""
         if language is None:
             language = self.default_language
         
-        if language not in self.supported_languages:
+        if language not in self._supported_set:
             language = self.default_language
         
         return self._load_language(language)
@@ -64,47 +142,87 @@ class TranslationManager:
     def get_translation(self, key: str, language: Optional[str] = None, fallback: Optional[str] = None) -> str:
         """Get a specific translation"""
         lang = language if language is not None else self.default_language
-        translations = self.get_translations(lang)
-        return translations.get(key, fallback or key)
+        # Two dict lookups on maps loaded up front; languages that are not
+        # loaded resolve in the default language
+        value = self._translations_cache.get(lang, self._default_map).get(key, _MISSING)
+        if value is _MISSING:
+            return fallback or key
+        return value
     
     def get_supported_languages(self) -> List[str]:
         """Get list of supported language codes"""
         return self.supported_languages
     
+    def _write_language_file(self, language_code: str, translations: Dict[str, str]) -> Tuple[int, int, int]:
+        """Atomically write a language file and return its version"""
+        language_file = f"{self._path_prefix}{language_code}.json"
+        os.makedirs(self.translations_dir, exist_ok=True)
+        
+        # Write to a temporary file and atomically replace the language file so
+        # readers never see a truncated one
+        with tempfile.NamedTemporaryFile('wb', dir=self.translations_dir,
+                                         prefix=f'.{language_code}-', suffix='.tmp',
+                                         delete=False) as f:
+            temp_file = f.name
+            try:
+                f.write(json_dumps(translations))
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception:
+                f.close()
+                os.remove(temp_file)
+                raise
+        os.replace(temp_file, language_file)
+        return _file_version(os.stat(language_file))
+    
     def add_language(self, language_code: str, translations: Dict[str, str]) -> bool:
         """Add a new language"""
         try:
-            language_file = os.path.join(self.translations_dir, f"{language_code}.json")
-            os.makedirs(self.translations_dir, exist_ok=True)
-            
-            with open(language_file, 'w', encoding='utf-8') as f:
-                json.dump(translations, f, indent=2, ensure_ascii=False)
-            
-            # Update cache and supported languages
-            self._translations_cache[language_code] = translations
-            if language_code not in self.supported_languages:
-                self.supported_languages.append(language_code)
-                self.supported_languages.sort()
+            translations = _intern_keys(translations)
+            with self._write_lock:
+                version = self._write_language_file(language_code, translations)
+                
+                # Update cache and supported languages
+                self._translations_cache = {**self._translations_cache, language_code: translations}
+                self._versions = {**self._versions, language_code: version}
+                self._failed_versions.pop(language_code, None)
+                if language_code == self.default_language:
+                    self._default_map = translations
+                if language_code not in self._supported_set:
+                    self.supported_languages = sorted(self.supported_languages + [language_code])
+                    self._supported_set = self._supported_set | {language_code}
             
             return True
         except Exception as e:
-            print(f"Error adding language {language_code}: {e}")
+            logger.error("Error adding language %s: %s", language_code, e)
             return False
     
     def update_translation(self, language_code: str, key: str, value: str) -> bool:
         """Update a specific translation"""
         try:
-            translations = self.get_translations(language_code).copy()
-            translations[key] = value
-            return self.add_language(language_code, translations)
+            with self._write_lock:
+                translations = self._translations_cache.get(language_code)
+                if translations is None:
+                    # Not loaded: start the language from the default translations
+                    return self.add_language(language_code,
+                                             {**self.get_translations(language_code), key: value})
+                
+                # Build the updated map aside and publish it only once it is on disk
+                translations = {**translations, sys.intern(key): value}
+                version = self._write_language_file(language_code, translations)
+                self._translations_cache = {**self._translations_cache, language_code: translations}
+                if language_code == self.default_language:
+                    self._default_map = translations
+                self._versions = {**self._versions, language_code: version}
+            return True
         except Exception as e:
-            print(f"Error updating translation {key} for {language_code}: {e}")
+            logger.error("Error updating translation %s for %s: %s", key, language_code, e)
             return False
     
     def reload_translations(self):
-        """Reload all translations from disk"""
-        self._translations_cache.clear()
-        self.supported_languages = self._discover_languages()
+        """Reload translations from disk, re-parsing only files changed since last read"""
+        with self._write_lock:
+            self._install(self._scan_languages())
 
 
 # Global translation manager instance